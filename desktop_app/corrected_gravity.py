@@ -1,14 +1,12 @@
 from os import access
-import struct
 import asyncio
 from bleak import BleakClient, discover
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import multiprocessing as mp
-from queue import Empty
+from multiprocessing.shared_memory import SharedMemory
 import numpy as np
-from collections import deque
-from typing import Deque
+from typing import Optional, Tuple
 from datetime import datetime
 import math
 import mplcyberpunk  # noqa: we use these cyberpunk theme below, import is required
@@ -22,55 +20,140 @@ BLE_DATA_UUID = 'fc0a2501-af4b-4c14-b795-a49e9f7e6b84'
 MAXIMUM_RUNTIME = 600  # in s
 PLOT_UPDATE_INTERVAL = 100  # in ms
 PLOT_MARGIN = 10  # in %
+PLOT_LIMIT_TOLERANCE = 10  # in %, plot limits are only updated once the data drifts further than this
+PLOT_LIMIT_MINIMUM_SLACK = 0.05  # in the unit of the plot, keeps the limits apart and settled for a constant signal
 S_BETWEEN_DATAPOINTS = 1 / 119.6  # We acquire data with ~119hz
 TIME_PLOTTED = 10  # in seconds
 NUMBER_OF_DATA_POINTS = int(math.floor(TIME_PLOTTED / S_BETWEEN_DATAPOINTS))
+MAX_DATAPOINTS_PER_FRAME = NUMBER_OF_DATA_POINTS // 2  # If we fall behind we catch up over multiple frames
 
 SAVE_ANIMATION = False
 PATH_TO_ANIMATION_FILE = "animation.mp4"
 
+RING_BUFFER_SIZE = 4096  # in datapoints, has to be a power of 2
 
-class DataPoint(object):
-    def __init__(self, timestamp: float, gyro_x: float, gyro_y: float, gyro_z: float, accel_x: float, accel_y: float, accel_z: float):
-        self.timestamp: float = timestamp
+# Every datapoint is stored as one float32 per column, the data of every column is kept contiguous.
+# There is no timestamp column, the time of a datapoint follows from its index times S_BETWEEN_DATAPOINTS
+COLUMN_GYRO_X = 0
+COLUMN_GYRO_Y = 1
+COLUMN_GYRO_Z = 2
+COLUMN_ACCEL_X = 3
+COLUMN_ACCEL_Y = 4
+COLUMN_ACCEL_Z = 5
+NUMBER_OF_COLUMNS = 6
 
-        self.gyro_x: float = gyro_x
-        self.gyro_y: float = gyro_y
-        self.gyro_z: float = gyro_z
+# The websocket clients expect gyro x, y, z followed by accel x, y, z
+WEBSOCKET_MESSAGE_FORMAT = ";".join(["%.3f"] * 6)
+WEBSOCKET_NO_DATA_MESSAGE = WEBSOCKET_MESSAGE_FORMAT % ((0.0,) * 6)
 
-        self.accel_x: float = accel_x
-        self.accel_y: float = accel_y
-        self.accel_z: float = accel_z
+
+def hysteresis_limits(current: Tuple[float, float], lower: float, upper: float) -> Optional[Tuple[float, float]]:
+    # New limits are only returned once the data leaves the current ones or they got too wide, None otherwise
+    slack = max((upper - lower) * (PLOT_LIMIT_TOLERANCE / 100), PLOT_LIMIT_MINIMUM_SLACK)
+
+    if lower < current[0] or upper > current[1] or lower - current[0] > 2 * slack or current[1] - upper > 2 * slack:
+        return lower - slack, upper + slack
+
+    return None
+
+
+def ordered_min_max(buckets: np.ndarray) -> np.ndarray:
+    # The minimum and maximum of every bucket in the order they were measured, so the line between buckets stays the same
+    minimum_index = buckets.argmin(axis=-1)
+    maximum_index = buckets.argmax(axis=-1)
+    order = np.stack((np.minimum(minimum_index, maximum_index), np.maximum(minimum_index, maximum_index)), axis=-1)
+
+    return np.take_along_axis(buckets, order, axis=-1)
+
+
+def min_max_decimate(data: np.ndarray, points: int) -> np.ndarray:
+    # Keeps the minimum and maximum of every bucket of the last axis, so spikes stay visible with about 2 * points values
+    bucket_size = data.shape[-1] // points
+    if bucket_size < 3:  # Buckets of 2 would give back as many values as they got
+        return data
+
+    # The oldest datapoints that do not fill a whole bucket get a smaller bucket of their own, so nothing is dropped
+    partial_size = data.shape[-1] % bucket_size
+    full_buckets = data.shape[-1] // bucket_size
+    buckets = data[..., partial_size:].reshape(*data.shape[:-1], full_buckets, bucket_size)
+
+    decimated = np.empty((*data.shape[:-1], full_buckets + (partial_size > 0), 2), dtype=data.dtype)
+    decimated[..., -full_buckets:, :] = ordered_min_max(buckets)
+
+    if partial_size > 0:
+        decimated[..., 0, :] = ordered_min_max(data[..., :partial_size])
+
+    return decimated.reshape(*data.shape[:-1], -1)
+
+
+class SharedRingBuffer(object):
+    def __init__(self, size: int, columns: int):
+        self.size: int = size
+        self.mask: int = size - 1  # Only works because the size is a power of 2
+        self.columns: int = columns
+
+        # The first 8 bytes hold the write index, the columns follow right after it, each one contiguous
+        self.shared_memory = SharedMemory(create=True, size=8 + size * columns * 4)
+
+        self.write_index = None
+        self.data = None
+
+    def __getstate__(self):
+        # Views into the shared memory can not be pickled, every process attaches its own ones
+        state = self.__dict__.copy()
+        state['write_index'] = None
+        state['data'] = None
+        return state
+
+    def attach(self):
+        if self.data is None:
+            self.write_index = np.ndarray((1,), dtype=np.uint64, buffer=self.shared_memory.buf)
+            self.data = np.ndarray((self.columns, self.size), dtype=np.float32, buffer=self.shared_memory.buf, offset=8)
+
+    def write(self, batch: np.ndarray):
+        self.attach()
+        start = int(self.write_index[0])
+        count = batch.shape[1]
+
+        self.data[:, np.arange(start, start + count) & self.mask] = batch
+
+        # Only publish the new write index once the data is in place, there is only one producer so no lock is needed
+        self.write_index[0] = start + count
+
+    def read(self, read_index: int, max_datapoints: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        self.attach()
+        end = int(self.write_index[0])
+
+        # A consumer that fell behind by more than the buffer size lost the oldest datapoints
+        start = max(read_index, end - self.size)
+
+        if max_datapoints is not None:
+            end = min(end, start + max_datapoints)
+
+        return self.data[:, np.arange(start, end) & self.mask], end
+
+    def read_latest(self, read_index: int) -> Tuple[np.ndarray, int]:
+        # Only the newest datapoint after read_index, for consumers that show the current value and skip everything before it
+        self.attach()
+        return self.read(max(read_index, int(self.write_index[0]) - 1), 1)
 
 
 class Nano33BLE(object):
-    def __init__(self, plot_q: mp.Queue, serial_q: mp.Queue):
-        self.plot_queue: mp.Queue = plot_q
-        self.serial_queue: mp.Queue = serial_q
+    def __init__(self, ring_buffer: SharedRingBuffer):
+        self.ring_buffer: SharedRingBuffer = ring_buffer
 
         self.current_datapoint = 0  # Temporary until we get timestamp
         self.datetime_started = datetime.utcnow()
 
     def callback_data(self, _, data):
-        floats = deque()
-        while len(data) > 0:
-            floats.append(struct.unpack("f", data[0:4])[0])
-            del data[0:4]
-
-        for i in range(0, len(floats), 6):
-            dp = DataPoint(self.current_datapoint * S_BETWEEN_DATAPOINTS,
-                           floats[i + 0],
-                           floats[i + 1],
-                           floats[i + 2],
-                           floats[i + 3],
-                           floats[i + 4],
-                           floats[i + 5])
-
-            self.current_datapoint += 1
-
-            # We send the data once to the plotter and once to the serial writer
-            self.plot_queue.put(dp)
-            self.serial_queue.put(dp)
+        # Every sample consists of 6 little endian floats: gyro x, y, z followed by accel x, y, z
+        samples = np.frombuffer(data, dtype='<f4').reshape(-1, NUMBER_OF_COLUMNS)
+
+        self.current_datapoint += len(samples)
+
+        # The sensor values are already in column order, so the transposed samples are the batch.
+        # The plotter and the websocket server both read it from the shared ring buffer
+        self.ring_buffer.write(samples.T)
 
     async def gather_data(self):
         print('Arduino Nano BLE Peripheral Central Service')
@@ -95,13 +178,19 @@ class Nano33BLE(object):
 
                         await client.stop_notify(BLE_DATA_UUID)
 
-    def process(self):
-        asyncio.run(self.gather_data())
-
 
 class Plotter(object):
-    def __init__(self, dq: mp.Queue):
-        self.data_queue = dq
+    def __init__(self, ring_buffer: SharedRingBuffer):
+        self.ring_buffer = ring_buffer
+        self.read_index = 0
+
+        # Preallocated ring holding the plotted window, one row per column. NaN is never drawn, so it marks unused space
+        self.window = np.full((NUMBER_OF_COLUMNS, NUMBER_OF_DATA_POINTS), np.nan, dtype=np.float32)
+        self.window_head = 0
+        self.window_filled = 0
+
+        # The newest datapoint is always plotted at 0s with the older ones left of it, so x never changes
+        self.plot_x = (np.arange(NUMBER_OF_DATA_POINTS, dtype=np.float32) - (NUMBER_OF_DATA_POINTS - 1)) * S_BETWEEN_DATAPOINTS
 
         self.figure = None
         self.axes = None
@@ -123,9 +212,10 @@ class Plotter(object):
         self.gyro_y_line = None
         self.gyro_z_line = None
 
+        self.pixel_width = None
+
     def init_plots(self):
         self.figure, self.axes = plt.subplots(nrows=2, ncols=3, figsize=(15, 10))
-        self.figure.tight_layout(pad=3)
         #self.figure.suptitle('Test')
 
         self.accel_x_plot = self.axes[0, 0]
@@ -138,37 +228,37 @@ class Plotter(object):
         self.accel_x_plot.set_title("X", fontsize=16)
         self.accel_x_plot.set_xlabel("Time [s]")
         self.accel_x_plot.set_ylabel("Acceleration [G]")
-        self.accel_x_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.accel_x_plot.set_xlim(-TIME_PLOTTED, 0)
         self.accel_x_plot.set_ylim(-3, 3)
 
         self.accel_y_plot.set_title("Y", fontsize=16)
         self.accel_y_plot.set_xlabel("Time [s]")
         self.accel_y_plot.set_ylabel("Acceleration [G]")
-        self.accel_y_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.accel_y_plot.set_xlim(-TIME_PLOTTED, 0)
         self.accel_y_plot.set_ylim(-3, 3)
 
         self.accel_z_plot.set_title("Z", fontsize=16)
         self.accel_z_plot.set_xlabel("Time [s]")
         self.accel_z_plot.set_ylabel("Acceleration [G]")
-        self.accel_z_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.accel_z_plot.set_xlim(-TIME_PLOTTED, 0)
         self.accel_z_plot.set_ylim(-3, 3)
 
         # self.gyro_plots_x.set_title("Gyro X")
         self.gyro_x_plot.set_xlabel("Time [s]")
         self.gyro_x_plot.set_ylabel("Position [° / S]")
-        self.gyro_x_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.gyro_x_plot.set_xlim(-TIME_PLOTTED, 0)
         self.gyro_x_plot.set_ylim(-100, 100)
 
         # self.gyro_plots_y.set_title("Gyro Y")
         self.gyro_y_plot.set_xlabel("Time [s]")
         self.gyro_y_plot.set_ylabel("Position [° / S]")
-        self.gyro_y_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.gyro_y_plot.set_xlim(-TIME_PLOTTED, 0)
         self.gyro_y_plot.set_ylim(-100, 100)
 
         # self.gyro_plots_z.set_title("Gyro Z")
         self.gyro_z_plot.set_xlabel("Time [s]")
         self.gyro_z_plot.set_ylabel("Position [° / S]")
-        self.gyro_z_plot.set_xlim(0, NUMBER_OF_DATA_POINTS)
+        self.gyro_z_plot.set_xlim(-TIME_PLOTTED, 0)
         self.gyro_z_plot.set_ylim(-100, 100)
 
         self.accel_z_line, = self.accel_x_plot.plot([], [], label="Accel X", color='cyan')
@@ -181,73 +271,84 @@ class Plotter(object):
 
         # self.figure.legend()
 
-    def animate(self, frame: int):  # noqa: frame is never used but required for the animation function
-        accel_x_y = self.accel_x_line.get_ydata()
-        accel_y_y = self.accel_y_line.get_ydata()
-        accel_z_y = self.accel_z_line.get_ydata()
+        # Lay the figure out once, after all titles and labels exist. Doing it per draw would be way too expensive
+        self.figure.tight_layout(pad=3)
 
-        gyro_x_y = self.gyro_x_line.get_ydata()
-        gyro_y_y = self.gyro_y_line.get_ydata()
-        gyro_z_y = self.gyro_z_line.get_ydata()
+        self.on_resize(None)
+        self.figure.canvas.mpl_connect('resize_event', self.on_resize)
 
-        x = self.accel_x_line.get_xdata()
+    def on_resize(self, event):  # noqa: event is never used but required for the callback
+        # All plots have the same size, so the width of one of them is enough
+        self.pixel_width = max(int(self.accel_x_plot.bbox.width), 1)
 
-        new_data: Deque[DataPoint] = deque()
+        # x never changes, so the lines only need new x data when the decimation changes with the pixel width
+        plotted_x = min_max_decimate(self.plot_x, self.pixel_width)
 
-        while True:
-            try:
-                new_data.append(self.data_queue.get(False))
+        self.accel_x_line.set_xdata(plotted_x)
+        self.accel_y_line.set_xdata(plotted_x)
+        self.accel_z_line.set_xdata(plotted_x)
 
-            except Empty:
-                break
+        self.gyro_x_line.set_xdata(plotted_x)
+        self.gyro_y_line.set_xdata(plotted_x)
+        self.gyro_z_line.set_xdata(plotted_x)
 
-        if len(new_data) == 0:
-            return self.accel_x_line, self.accel_y_line, self.accel_z_line, self.gyro_x_line, self.gyro_y_line, self.gyro_z_line
+        # The y data has to match the new x data right away, the next frame might not bring any new data
+        self.set_line_data(self.unwrap_window())
 
-        new_x_data = deque()
+    def unwrap_window(self) -> np.ndarray:
+        # Oldest data first. While the window is not full yet the unused NaN part comes first, so the newest data is at 0s
+        return np.concatenate((self.window[:, self.window_head:], self.window[:, :self.window_head]), axis=1)
+
+    def set_line_data(self, window: np.ndarray):
+        # Drawing more than two datapoints per pixel is wasted work, so we only keep the min and max of every pixel
+        plotted = min_max_decimate(window, self.pixel_width)
+
+        # Set line data. This updates the actual plot lines
+        self.accel_x_line.set_ydata(plotted[COLUMN_ACCEL_X])
+        self.accel_y_line.set_ydata(plotted[COLUMN_ACCEL_Y])
+        self.accel_z_line.set_ydata(plotted[COLUMN_ACCEL_Z])
 
-        new_accel_x_data = deque()
-        new_accel_y_data = deque()
-        new_accel_z_data = deque()
+        self.gyro_x_line.set_ydata(plotted[COLUMN_GYRO_X])
+        self.gyro_y_line.set_ydata(plotted[COLUMN_GYRO_Y])
+        self.gyro_z_line.set_ydata(plotted[COLUMN_GYRO_Z])
 
-        new_gyro_x_data = deque()
-        new_gyro_y_data = deque()
-        new_gyro_z_data = deque()
+    def animate(self, frame: int):  # noqa: frame is never used but required for the animation function
+        new_data, self.read_index = self.ring_buffer.read(self.read_index, MAX_DATAPOINTS_PER_FRAME)
 
-        for dp in new_data:
-            dp: DataPoint
+        if new_data.shape[1] == 0:
+            return self.accel_x_line, self.accel_y_line, self.accel_z_line, self.gyro_x_line, self.gyro_y_line, self.gyro_z_line
 
-            new_x_data.append(dp.timestamp)
+        # Flip accel x to correct the direction of gravity
+        new_data[COLUMN_ACCEL_X] *= -1
 
-            new_accel_x_data.append(-dp.accel_x)
-            new_accel_y_data.append(dp.accel_y)
-            new_accel_z_data.append(dp.accel_z)
+        # Write the new data into the window, wrapping around at the end
+        new_data = new_data[:, -NUMBER_OF_DATA_POINTS:]
+        first_part = min(new_data.shape[1], NUMBER_OF_DATA_POINTS - self.window_head)
 
-            new_gyro_x_data.append(dp.gyro_x)
-            new_gyro_y_data.append(dp.gyro_y)
-            new_gyro_z_data.append(dp.gyro_z)
+        self.window[:, self.window_head:self.window_head + first_part] = new_data[:, :first_part]
+        self.window[:, :new_data.shape[1] - first_part] = new_data[:, first_part:]
 
-        x = np.append(x, new_x_data)[-NUMBER_OF_DATA_POINTS:]
+        self.window_head = (self.window_head + new_data.shape[1]) % NUMBER_OF_DATA_POINTS
+        self.window_filled = min(self.window_filled + new_data.shape[1], NUMBER_OF_DATA_POINTS)
 
-        accel_x_y = np.append(accel_x_y, new_accel_x_data)[-NUMBER_OF_DATA_POINTS:]
-        accel_y_y = np.append(accel_y_y, new_accel_y_data)[-NUMBER_OF_DATA_POINTS:]
-        accel_z_y = np.append(accel_z_y, new_accel_z_data)[-NUMBER_OF_DATA_POINTS:]
+        # Unwrap the window once so the oldest data comes first
+        unwrapped = self.unwrap_window()
 
-        gyro_x_y = np.append(gyro_x_y, new_gyro_x_data)[-NUMBER_OF_DATA_POINTS:]
-        gyro_y_y = np.append(gyro_y_y, new_gyro_y_data)[-NUMBER_OF_DATA_POINTS:]
-        gyro_z_y = np.append(gyro_z_y, new_gyro_z_data)[-NUMBER_OF_DATA_POINTS:]
+        # Only the part of the window that already holds data counts for the limits
+        window = unwrapped[:, NUMBER_OF_DATA_POINTS - self.window_filled:]
 
-        min_x = min(x, default=0)
-        max_x = max(x, default=10)
+        # One pass per direction gives the limits of every column, the plots then only pick from these few values
+        minimums = window.min(axis=1).tolist()
+        maximums = window.max(axis=1).tolist()
 
-        min_accel_y_x = np.min(accel_x_y)
-        max_accel_y_x = np.max(accel_x_y)
+        min_accel_y_x = minimums[COLUMN_ACCEL_X]
+        max_accel_y_x = maximums[COLUMN_ACCEL_X]
         
-        min_accel_y_y = min(accel_y_y)
-        max_accel_y_y = max(accel_y_y)
+        min_accel_y_y = minimums[COLUMN_ACCEL_Y]
+        max_accel_y_y = maximums[COLUMN_ACCEL_Y]
         
-        min_accel_y_z = min(accel_z_y)
-        max_accel_y_z = max(accel_z_y)
+        min_accel_y_z = minimums[COLUMN_ACCEL_Z]
+        max_accel_y_z = maximums[COLUMN_ACCEL_Z]
 
         #accel_delta_x = max((max_accel_y_x - min_accel_y_x) * (PLOT_MARGIN / 100), 1)
         #accel_delta_y = max((max_accel_y_y - min_accel_y_y) * (PLOT_MARGIN / 100), 1)
@@ -262,103 +363,105 @@ class Plotter(object):
         #min_accel_y_z -= accel_delta_z
         #max_accel_y_z += accel_delta_z
 
-        min_gyro_y = min(gyro_x_y + gyro_y_y + gyro_z_y)
-        max_gyro_y = max(gyro_x_y + gyro_y_y + gyro_z_y)
+        min_gyro_y = min(minimums[COLUMN_GYRO_X:COLUMN_GYRO_Z + 1])
+        max_gyro_y = max(maximums[COLUMN_GYRO_X:COLUMN_GYRO_Z + 1])
 
         gyro_delta = max((max_gyro_y - min_gyro_y) * (PLOT_MARGIN / 100), 10)
 
         min_gyro_y -= gyro_delta
         max_gyro_y += gyro_delta
 
-        # Set Plot limits. This "zooms" the plot correctly
-        self.accel_x_plot.set_xlim(min_x, max_x)  # noqa: We are aware this looks duplicate but its easy this way
-        self.accel_y_plot.set_xlim(min_x, max_x)
-        self.accel_z_plot.set_xlim(min_x, max_x)
-        self.accel_x_plot.set_ylim(min_accel_y_z, max_accel_y_z)
-        self.accel_y_plot.set_ylim(min_accel_y_y, max_accel_y_y)
-        self.accel_z_plot.set_ylim(min_accel_y_x, max_accel_y_x)
-
-        self.gyro_x_plot.set_xlim(min_x, max_x)  # noqa: We are aware this looks duplicate but its easy this way
-        self.gyro_y_plot.set_xlim(min_x, max_x)
-        self.gyro_z_plot.set_xlim(min_x, max_x)
-        self.gyro_x_plot.set_ylim(min_gyro_y, max_gyro_y)
-        self.gyro_y_plot.set_ylim(min_gyro_y, max_gyro_y)
-        self.gyro_z_plot.set_ylim(min_gyro_y, max_gyro_y)
+        # Set Plot limits. This "zooms" the plot correctly, x is fixed so only y has to be adjusted
+        # Every change forces a full redraw instead of blitting the lines, so we only do it once the data drifted away
+        limits_changed = False
 
-        # Set line data. This updates the actual plot lines
-        self.accel_x_line.set_data(x, accel_x_y)
-        self.accel_y_line.set_data(x, accel_y_y)
-        self.accel_z_line.set_data(x, accel_z_y)
+        accel_x_limits = hysteresis_limits(self.accel_x_plot.get_ylim(), min_accel_y_z, max_accel_y_z)
+        if accel_x_limits is not None:
+            self.accel_x_plot.set_ylim(*accel_x_limits)
+            limits_changed = True
+
+        accel_y_limits = hysteresis_limits(self.accel_y_plot.get_ylim(), min_accel_y_y, max_accel_y_y)
+        if accel_y_limits is not None:
+            self.accel_y_plot.set_ylim(*accel_y_limits)
+            limits_changed = True
+
+        accel_z_limits = hysteresis_limits(self.accel_z_plot.get_ylim(), min_accel_y_x, max_accel_y_x)
+        if accel_z_limits is not None:
+            self.accel_z_plot.set_ylim(*accel_z_limits)
+            limits_changed = True
+
+        gyro_limits = hysteresis_limits(self.gyro_x_plot.get_ylim(), min_gyro_y, max_gyro_y)
+        if gyro_limits is not None:
+            self.gyro_x_plot.set_ylim(*gyro_limits)
+            self.gyro_y_plot.set_ylim(*gyro_limits)
+            self.gyro_z_plot.set_ylim(*gyro_limits)
+            limits_changed = True
+
+        if limits_changed:
+            # Blitting only redraws the lines, the axes need one full redraw to show the new limits
+            self.figure.canvas.draw()
 
-        self.gyro_x_line.set_data(x, gyro_x_y)
-        self.gyro_y_line.set_data(x, gyro_y_y)
-        self.gyro_z_line.set_data(x, gyro_z_y)
+        self.set_line_data(unwrapped)
 
         return self.accel_x_line, self.accel_y_line, self.accel_z_line, self.gyro_x_line, self.gyro_y_line, self.gyro_z_line
 
     def plot(self):
         plt.style.use('cyberpunk')
         self.init_plots()
-        self.animation = FuncAnimation(self.figure, self.animate, blit=False, interval=PLOT_UPDATE_INTERVAL)
+        self.animation = FuncAnimation(self.figure, self.animate, blit=True, interval=PLOT_UPDATE_INTERVAL)
         plt.show()
 
 
 class WebsocketServer(object):
-    def __init__(self, serial_q: mp.Queue):
-        self.data_queue = serial_q
+    def __init__(self, ring_buffer: SharedRingBuffer):
+        self.ring_buffer = ring_buffer
 
     async def ws_handler(self, ws: WebSocketServerProtocol, uri: str) -> None:
         print(f"{datetime.utcnow()}: {ws.remote_address} connected and wants some data")
 
+        read_index = 0
+
         try:
             async for message in ws:
                 print(f"Received Message: {message}")
-                new_data: Deque[DataPoint] = deque()
-
-                while True:
-                    try:
-                        new_data.append(self.data_queue.get(False))
-
-                    except Empty:
-                        break
+                new_data, read_index = self.ring_buffer.read_latest(read_index)
 
                 try:
-                    data_to_send: DataPoint = new_data[-1]
-                    await ws.send(f"{data_to_send.gyro_x:.3f};{data_to_send.gyro_y:.3f};{data_to_send.gyro_z:.3f};{data_to_send.accel_x:.3f};{data_to_send.accel_y:.3f};{data_to_send.accel_z:.3f}")
-                except:
-                    await ws.send(f"0.000;0.000;0.000;0.000;0.000;0.000")
+                    data_to_send = new_data[COLUMN_GYRO_X:COLUMN_ACCEL_Z + 1, -1].tolist()
+                    await ws.send(WEBSOCKET_MESSAGE_FORMAT % tuple(data_to_send))
+                except IndexError:  # No new data since the last message
+                    await ws.send(WEBSOCKET_NO_DATA_MESSAGE)
         except ConnectionClosed:
             print("Connection was closed violently, but we survived!")
 
-    def process(self):
-        start_server = websockets.serve(self.ws_handler, "localhost", 4000)
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(start_server)
-        loop.run_forever()
+    async def serve(self):
+        async with websockets.serve(self.ws_handler, "localhost", 4000):
+            await asyncio.Future()  # Never completes, we serve until the program gets stopped
+
+
+async def gather_and_serve(ard: Nano33BLE, websocket_server: WebsocketServer):
+    # Both only wait for I/O, so they share one event loop and the websocket server reads the ring buffer in process
+    await asyncio.gather(ard.gather_data(), websocket_server.serve())
 
 
 if __name__ == '__main__':
     try:
-        plot_queue = mp.Queue()
-        serial_queue = mp.Queue()
+        ring_buffer = SharedRingBuffer(RING_BUFFER_SIZE, NUMBER_OF_COLUMNS)
 
-        ard = Nano33BLE(plot_queue, serial_queue)
-        plotter = Plotter(plot_queue)
-        websocket_server = WebsocketServer(serial_queue)
+        ard = Nano33BLE(ring_buffer)
+        plotter = Plotter(ring_buffer)
+        websocket_server = WebsocketServer(ring_buffer)
 
-        data_p = mp.Process(target=ard.process)
+        # Only the plotter gets its own process, matplotlib would block the event loop otherwise
         plot_p = mp.Process(target=plotter.plot)
-        websocket_p = mp.Process(target=websocket_server.process)
-
-        data_p.start()
         plot_p.start()
-        websocket_p.start()
 
-        data_p.join()
-        websocket_p.join()
+        asyncio.run(gather_and_serve(ard, websocket_server))
     except KeyboardInterrupt:
         print('\nReceived Keyboard Interrupt')
     finally:
         if SAVE_ANIMATION:
             plotter.animation.save(PATH_TO_ANIMATION_FILE)  # noqa: Plotter is never undefined or we dont get here anways
+        ring_buffer.shared_memory.close()  # noqa: Same as above, the ring buffer is created first
+        ring_buffer.shared_memory.unlink()
         print('Program finished')
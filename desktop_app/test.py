@@ -5,9 +5,14 @@ import multiprocessing as mp
 
 
 
-# initializing empty values
+# the spiral reaches the edge of the
+# axis after this many frames
+MAX_FRAMES = 500
+
+# preallocating the values
 # for x and y co-ordinates
-xdata, ydata = [], []
+xdata = np.empty(MAX_FRAMES, dtype=np.float64)
+ydata = np.empty(MAX_FRAMES, dtype=np.float64)
 
 
 # animation function
@@ -20,11 +25,11 @@ def animate(i, line):
     x = t * np.sin(t)
     y = t * np.cos(t)
 
-    # appending values to the previously
-    # empty x and y data holders
-    xdata.append(x)
-    ydata.append(y)
-    line.set_data(xdata, ydata)
+    # writing the values into the
+    # preallocated x and y data holders
+    xdata[i] = x
+    ydata[i] = y
+    line.set_data(xdata[:i + 1], ydata[:i + 1])
 
     return line,
 
@@ -39,7 +44,9 @@ def plot():
     line, = axis.plot([], [], lw=2)
 
     # calling the animation function
-    anim = animation.FuncAnimation(fig, animate,
+    # the animation starts over once
+    # all frames have been drawn
+    anim = animation.FuncAnimation(fig, animate, frames=MAX_FRAMES,
                                    fargs=(line, ))
     plt.show()
 